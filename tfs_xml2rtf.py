@@ -1,24 +1,18 @@
 #!/usr/bin/env python
 
-import xml.etree.ElementTree as ET
+from lxml import etree as ET
 import argparse
 import os
 import shutil
 import subprocess
-import glob
 import inspect
 import tqdm
 import math
-can_import_xls=False
-try:
-  import pandas as pd
-  try:
-    import xlrd
-    can_import_xls=True
-  except ModuleNotFoundError:
-    print("WARNING! Can't find 'xlrd' module. Continuing...")
-except ModuleNotFoundError:
-  print("WARNING! Can't find 'pandas' module. Continuing...")
+import concurrent.futures
+import functools
+import string
+import struct
+import contextlib
 
 USAGE="""
 Navigates directory tree and extracts selected information from EPU XML file series.
@@ -28,10 +22,105 @@ USAGE:
 
 """ % ((__file__,)*1)
 
-MODIFIED="Modified 2026 May 06"
+MODIFIED="Modified 2026 Oct 15"
 MAX_VERBOSITY=4
+XML_CHUNKSIZE=32  # Number of XML files per worker task, no process pool is started for this many files or fewer
+
+# Namespaces used in EPU XML files
+NAMESPACE_SHARED= 'http://schemas.datacontract.org/2004/07/Fei.SharedObjects'
+NAMESPACE_ARRAY= 'http://schemas.microsoft.com/2003/10/Serialization/Arrays'
+
+# Namespace-qualified tags, as lxml represents them internally, e.g., '{namespace}InstrumentModel'
+NAMESPACE_SHARED_STR= "{" + NAMESPACE_SHARED + "}"
+NAMESPACE_ARRAY_STR= "{" + NAMESPACE_ARRAY + "}"
+SHARED_TAGS= {name: NAMESPACE_SHARED_STR + name for name in (
+  'InstrumentModel', 'AccelerationVoltage', 'ApplicationSoftware', 'ApplicationSoftwareVersion',
+  'SpotIndex', 'NominalMagnification', 'EnergySelectionSlitWidth',
+  'pixelSize', 'numericValue', 'Position', 'A', 'camera', 'ExposureTime'
+  )}
+ARRAY_TAGS= {name: NAMESPACE_ARRAY_STR + name for name in ('KeyValueOfstringanyType', 'Key', 'Value')}
+PIXEL_SIZE_KEYS= {NAMESPACE_SHARED_STR + axis: f"pixelSize/{axis}/numericValue" for axis in ('x', 'y')}
+
+# Tags extracted from the XML files, mapping namespace-qualified tag to local name
+XML_TARGET_TAGS= {SHARED_TAGS[name]: name for name in (
+  'InstrumentModel', 'AccelerationVoltage', 'ApplicationSoftware', 'ApplicationSoftwareVersion',
+  'SpotIndex', 'NominalMagnification', 'EnergySelectionSlitWidth',
+  'pixelSize', 'A', 'ExposureTime'
+  )}
+XML_TARGET_TAGS[ARRAY_TAGS['KeyValueOfstringanyType']]= 'KeyValueOfstringanyType'
+
+# Padding between tag & value when printing tags (verbosity 4)
+TAG_PADS= {
+  'InstrumentModel': '\t\t\t',
+  'DetectorCommercialName': '\t\t',
+  'ElectronCountingEnabled': '\t\t',
+  'AccelerationVoltage': '\t\t\t',
+  'ApplicationSoftware': '\t\t\t',
+  'ApplicationSoftwareVersion': '\t\t',
+  'Aperture[C1].Name': '\t\t\t',
+  'Aperture[C2].Name': '\t\t\t',
+  'Aperture[C3].Name': '\t\t\t',
+  'Aperture[OBJ].Name': '\t\t\t',
+  'SpotIndex': '\t\t\t\t',
+  'NominalMagnification': '\t\t\t',
+  'pixelSize/x/numericValue': '\t\t\t',
+  'pixelSize/y/numericValue': '\t\t\t',
+  'Position/A': '\t\t\t\t\t',
+  'AppliedDefocus': '\t\t\t',
+  'Detectors[EF-Falcon].TotalDose': '\t',
+  'Dose': '\t\t\t\t\t',
+  'EnergySelectionSlitWidth': '\t\t',
+  'Detectors[EF-Falcon].ExposureTime': '\t',
+  'Detectors[BM-Falcon].ExposureTime': '\t',
+  'camera/ExposureTime': '\t\t\t\t',
+  'Detectors[EF-Falcon].FrameRate': '\t'
+  }
+
+# Tags needed for the defocus & tilt ranges only
+XML_RANGE_TAGS= {SHARED_TAGS['A']: 'A', ARRAY_TAGS['KeyValueOfstringanyType']: 'KeyValueOfstringanyType'}
+
+# Values used for the report & sanity checks, extract_fields stops reading once all are found
+# Keys are given as alternatives, since the detector tag is different on Krios and Glacios
+REQUIRED_TAGS= frozenset([
+  'InstrumentModel', 'AccelerationVoltage', 'ApplicationSoftware', 'ApplicationSoftwareVersion',
+  'SpotIndex', 'NominalMagnification', 'EnergySelectionSlitWidth',
+  'pixelSize/x/numericValue', 'pixelSize/y/numericValue', 'Position/A', 'camera/ExposureTime'
+  ])
+REQUIRED_KEYS= (
+  ('DetectorCommercialName',), ('ElectronCountingEnabled',),
+  ('Aperture[C2].Name',), ('Aperture[OBJ].Name',), ('AppliedDefocus',),
+  ('Detectors[EF-Falcon].ExposureTime', 'Detectors[BM-Falcon].ExposureTime')
+  )
+# Keys that are only printed (at the highest verbosity)
+PRINT_REQUIRED_KEYS= REQUIRED_KEYS + (
+  ('Aperture[C1].Name',), ('Aperture[C3].Name',), ('Dose',), ('Detectors[EF-Falcon].FrameRate',)
+  )
+RANGE_REQUIRED_TAGS= frozenset(['Position/A'])
+RANGE_REQUIRED_KEYS= ( ('AppliedDefocus',), )
 
 def main(options):
+  # Spreadsheet libraries are only checked here, so that process-pool workers don't re-import them
+  can_import_xls=False
+  try:
+    import pandas
+    try:
+      import xlrd
+      can_import_xls=True
+    except ModuleNotFoundError:
+      print("WARNING! Can't find 'xlrd' module. Continuing...")
+  except ModuleNotFoundError:
+    print("WARNING! Can't find 'pandas' module. Continuing...")
+
+  if options.max_depth < 0:
+    print(f"\nERROR!! Maximum search depth must be 0 or more, not {options.max_depth}!")
+    print("  Exiting...\n")
+    exit()
+
+  if options.sample < 0:
+    print(f"\nERROR!! Number of XML files to sample must be 0 or more, not {options.sample}!")
+    print("  Exiting...\n")
+    exit()
+
   verbosity= options.verbosity
   xml_list= []
   if options.progress and verbosity!=2: verbosity=1
@@ -54,12 +143,13 @@ def main(options):
 
     print(f"  Output filename: {options.output}")
     print(f"  Skip movie scan? {options.no_scan}")
+    print(f"  XML files to sample: {options.sample if options.sample else 'all'}")
     print(f"  Show progress bar? {options.progress}")
     print(f"  Verbosity level: {verbosity}")
     print()
 
   if verbosity>=1: print("Navigating top-level directory...")
-  dir_list= [x[0] for x in os.walk(options.directory) if os.path.basename(x[0]) == 'Data']
+  dir_list= list( find_data_dirs(options.directory, max_depth=options.max_depth if options.max_depth else None) )
   if verbosity>=1: print("Finished navigating directory\n")
 
   # Loop through directories
@@ -67,14 +157,15 @@ def main(options):
     rel_path= os.path.relpath(curr_dir, start=options.directory)
 
     # "Data" directories will be three directories down from top-level project directory
-    rel_depth= len( rel_path.split('/') )
+    rel_depth= rel_path.count(os.sep) + 1
 
     if verbosity>=2:
       printvars(['rel_path', 'curr_dir', 'rel_depth'])
 
     # Search for XML files
     ###if rel_depth==2:  # SHOULDN'T NEED TO CHECK DEPTH IF DIRECTORY IS CALLED 'Data'
-    dir_xmls= glob.glob( os.path.join(curr_dir, 'Foil*.xml') )
+    with os.scandir(curr_dir) as dir_entries:
+      dir_xmls= [entry.path for entry in dir_entries if entry.name.startswith('Foil') and entry.name.endswith('.xml')]
     xml_list+= dir_xmls
     if verbosity>=2:
       print(f"num_xmls: {len(dir_xmls)}")
@@ -82,179 +173,203 @@ def main(options):
 
   if len(xml_list) == 0:
     print(f"\nERROR!! Found 0 XML files in {len(dir_list)} directories!")
+    if options.max_depth:
+      print(f"  'Data' directories were only searched up to {options.max_depth} levels below '{options.directory}' (see --max_depth)")
     print("  Exiting...\n")
     exit()
   else:
     if verbosity>=2: print()
     if verbosity>=1:
       print(f"Found {len(xml_list)} XML files in {len(dir_list)} directories")
+      if options.sample and len(xml_list) - 2 > options.sample:
+        print(f"Sampling {options.sample} XML files after the first 2 for defocus & tilt ranges")
       if not options.no_scan:
         print("Scanning first 2 movies for number of frames...")
       else:
         print("Not scanning movies for number of frames...")
       print()
 
+  # Optionally estimate the defocus & tilt ranges from evenly spaced XML files
+  # The first two are always kept for the movie scan, and the last for the report settings
+  if options.sample and len(xml_list) - 2 > options.sample:
+    sample_step= (len(xml_list) - 2) / options.sample
+    xml_list= xml_list[:2] + [xml_list[ -1 - int(sample_idx*sample_step) ] for sample_idx in reversed( range(options.sample) )]
+
   # Initialize
-  min_df=+999.9
-  max_df=-999.9
+  df_list= []
+  tilt_list= []
   num_frames= None
   movie_format= None
-  min_tilt=+360.0
-  max_tilt=-360.0
 
   do_disable= verbosity!=1 or options.debug
 
+  # The report uses the microscope settings from the last XML file, so only it is read fully (or all of them, if printing tags)
+  # Otherwise just the defocus & tilt are needed
+  ranges_only_list= [xml_idx < len(xml_list)-1 and verbosity<4 for xml_idx in range( len(xml_list) )]
+  print_all_list= [verbosity>=4] * len(xml_list)
+
+  # Parse XML files in parallel (unless there are only a few), results are returned in the same order as xml_list
+  use_pool= len(xml_list) > XML_CHUNKSIZE
+  with concurrent.futures.ProcessPoolExecutor() if use_pool else contextlib.nullcontext() as executor:
+    if use_pool:
+      xml_iter= executor.map(extract_fields, xml_list, ranges_only_list, print_all_list, chunksize=XML_CHUNKSIZE)
+    else:
+      xml_iter= map(extract_fields, xml_list, ranges_only_list, print_all_list)
+
+    # Only wrap in a progress bar if it will be shown
+    if not do_disable:
+      xml_iter= tqdm.tqdm(
+        xml_iter,
+        total=len(xml_list),
+        unit='xml',
+        miniters=max( 1, len(xml_list)//200 ),
+        mininterval=0.2
+        )
+
+    xml_results= list(xml_iter)
+
+  # Only print tags at the highest verbosity
+  tag_pads= TAG_PADS if verbosity>=4 else {}
+
   # Loop through XML files
-  for xml_idx in tqdm.tqdm(range( len(xml_list) ), unit='xml', disable=do_disable):
-    curr_xml= xml_list[xml_idx]
+  for xml_idx, curr_xml in enumerate(xml_list):
     if verbosity>=4:
       print(f"XML file:\t\t\t\t {curr_xml}")
     elif verbosity>=3:
       print(f"XML file[{xml_idx+1}]: {curr_xml}")
 
-    tree = ET.parse(curr_xml)
-    root=tree.getroot()
+    # Tags were read in one pass by extract_fields
+    tag_dict, keyvalue_dict= xml_results[xml_idx]
+    full_parse= not ranges_only_list[xml_idx]
 
-    # Find the relevant elements using the namespace
-    namespace_shared_dict = {'a': 'http://schemas.datacontract.org/2004/07/Fei.SharedObjects'}
-    namespace_shared_str = "{" + namespace_shared_dict['a'] + "}"
-    namespace_array_dict = {'a': 'http://schemas.microsoft.com/2003/10/Serialization/Arrays'}
+    # Only the defocus & tilt angle are read from XML files other than the last (unless printing tags)
+    if full_parse:
+      # InstrumentModel
+      scope_text= get_simple_tag(tag_dict, "InstrumentModel", pad=tag_pads.get("InstrumentModel"))
 
-    # InstrumentModel
-    scope_text= find_simple_tag(root, "InstrumentModel", namespace_shared_dict, pad='\t\t\t' if verbosity>=4 else '')
-
-    # Krios name starts with TITAN####
-    if scope_text.startswith("TITAN"):
-      scope_title= "Krios"
-    else:
-      scope_title= scope_text.split('-')[0].title()
+      # Krios name starts with TITAN####
+      if scope_text.startswith("TITAN"):
+        scope_title= "Krios"
+      else:
+        scope_title= scope_text.split('-')[0].title()
 
-    # DetectorCommercialName
-    cam_text= find_complex_tag(root, "DetectorCommercialName", namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t\t' if verbosity>=4 else '')
+      # DetectorCommercialName
+      cam_text= get_complex_tag(keyvalue_dict, "DetectorCommercialName", pad=tag_pads.get("DetectorCommercialName"))
 
-    # Counting
-    count_text= find_complex_tag(root, "ElectronCountingEnabled", namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t\t' if verbosity>=4 else '')
+      # Counting
+      count_text= get_complex_tag(keyvalue_dict, "ElectronCountingEnabled", pad=tag_pads.get("ElectronCountingEnabled"))
 
-    # Voltage
-    volt_text= find_simple_tag(root, "AccelerationVoltage", namespace_shared_dict, pad='\t\t\t' if verbosity>=4 else '')
+      # Voltage
+      volt_text= get_simple_tag(tag_dict, "AccelerationVoltage", pad=tag_pads.get("AccelerationVoltage"))
 
-    # Software version
-    sw_text= find_simple_tag(root, "ApplicationSoftware", namespace_shared_dict, pad='\t\t\t' if verbosity>=4 else '')
-    version_text= find_simple_tag(root, "ApplicationSoftwareVersion", namespace_shared_dict, pad='\t\t' if verbosity>=4 else '')
+      # Software version
+      sw_text= get_simple_tag(tag_dict, "ApplicationSoftware", pad=tag_pads.get("ApplicationSoftware"))
+      version_text= get_simple_tag(tag_dict, "ApplicationSoftwareVersion", pad=tag_pads.get("ApplicationSoftwareVersion"))
 
-    # Apertures
-    c1_text= find_complex_tag(root, "Aperture[C1].Name", namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t\t\t' if verbosity>=4 else '')
-    c2_text= find_complex_tag(root, "Aperture[C2].Name", namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t\t\t' if verbosity>=4 else '')
-    c3_text= find_complex_tag(root, "Aperture[C3].Name", namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t\t\t' if verbosity>=4 else '')
-    obj_aperture= find_complex_tag(root, "Aperture[OBJ].Name", namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t\t\t' if verbosity>=4 else '')
-    #printvars('obj_aperture',True)
+      # Apertures
+      c1_text= get_complex_tag(keyvalue_dict, "Aperture[C1].Name", pad=tag_pads.get("Aperture[C1].Name"))
+      c2_text= get_complex_tag(keyvalue_dict, "Aperture[C2].Name", pad=tag_pads.get("Aperture[C2].Name"))
+      c3_text= get_complex_tag(keyvalue_dict, "Aperture[C3].Name", pad=tag_pads.get("Aperture[C3].Name"))
+      obj_aperture= get_complex_tag(keyvalue_dict, "Aperture[OBJ].Name", pad=tag_pads.get("Aperture[OBJ].Name"))
+      #printvars('obj_aperture',True)
 
-    # optics -> SpotIndex
-    spot_text= find_simple_tag(root, "SpotIndex", namespace_shared_dict, pad='\t\t\t\t' if verbosity>=4 else '')
+      # optics -> SpotIndex
+      spot_text= get_simple_tag(tag_dict, "SpotIndex", pad=tag_pads.get("SpotIndex"))
 
-    # TemMagnification -> NominalMagnification
-    mag_text= find_simple_tag(root, "NominalMagnification", namespace_shared_dict, pad='\t\t\t' if verbosity>=4 else '')
+      # TemMagnification -> NominalMagnification
+      mag_text= get_simple_tag(tag_dict, "NominalMagnification", pad=tag_pads.get("NominalMagnification"))
 
-    # SpatialScale -> pixelSize -> {x,y} -> numericValue
-    apix_element= find_element(root, "pixelSize", namespace_shared_dict, prefix='  ')
-    apix_x_element= find_element(apix_element, "x", namespace_shared_dict)
-    apix_x_text= find_simple_tag(apix_x_element, "numericValue", namespace_shared_dict, pad='\t\t\t' if verbosity>=4 else '', prefix='x')
-    apix_y_element= find_element(apix_element, "y", namespace_shared_dict)
-    apix_y_text= find_simple_tag(apix_y_element, "numericValue", namespace_shared_dict, pad='\t\t\t' if verbosity>=4 else '', prefix='y')
-    assert apix_x_text==apix_y_text, f"UH OH!! Pixel size in x ({apix_x_text}) doesn't equal in y ({apix_y_text})!"
+      # SpatialScale -> pixelSize -> {x,y} -> numericValue
+      apix_x_text= get_simple_tag(tag_dict, "pixelSize/x/numericValue", pad=tag_pads.get("pixelSize/x/numericValue"), prefix='x')
+      apix_y_text= get_simple_tag(tag_dict, "pixelSize/y/numericValue", pad=tag_pads.get("pixelSize/y/numericValue"), prefix='y')
+      assert math.isclose( float(apix_x_text), float(apix_y_text) ), f"UH OH!! Pixel size in x ({apix_x_text}) doesn't equal in y ({apix_y_text})!"
 
     # Position -> A (tilt angle)
-    position_element= find_element(root, "Position", namespace_shared_dict, prefix='  ')
-    tilt_radians= find_simple_tag(position_element, "A", namespace_shared_dict, pad='\t\t\t\t\t' if verbosity>=4 else '')
+    tilt_radians= get_simple_tag(tag_dict, "Position/A", pad=tag_pads.get("Position/A"))
     tilt_degrees= round(math.degrees( float(tilt_radians) ),1)
-
-    # Check against extrema
-    if min_tilt > tilt_degrees : min_tilt=tilt_degrees
-    if max_tilt < tilt_degrees : max_tilt=tilt_degrees
+    tilt_list.append(tilt_degrees)
 
     # AppliedDefocus
-    df_text= find_complex_tag(root, "AppliedDefocus", namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t\t\t' if verbosity>=4 else '')
+    df_text= get_complex_tag(keyvalue_dict, "AppliedDefocus", pad=tag_pads.get("AppliedDefocus"))
 
-    # Check against defocus extrema
-    df_microns= float(df_text)*1e+6
-    if -min_df < -df_microns : min_df=df_microns
-    if -max_df > -df_microns : max_df=df_microns
+    df_list.append( float(df_text)*1e+6 )
+
+    if not full_parse: continue
 
     ### Detectors[EF-Falcon].TotalDose (UNITS?)
-    ##f4_dose_text= find_complex_tag(root, "Detectors[EF-Falcon].TotalDose", namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t' if verbosity>=4 else '')
+    ##f4_dose_text= get_complex_tag(keyvalue_dict, "Detectors[EF-Falcon].TotalDose", pad=tag_pads.get("Detectors[EF-Falcon].TotalDose"))
 
     # Dose (UNITS?)
-    custom_dose_text= find_complex_tag(root, "Dose", namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t\t\t\t\t' if verbosity>=4 else '')
+    custom_dose_text= get_complex_tag(keyvalue_dict, "Dose", pad=tag_pads.get("Dose"))
 
     # EnergySelectionSlitWidth
-    slit_text= find_simple_tag(root, "EnergySelectionSlitWidth", namespace_shared_dict, pad='\t\t' if verbosity>=4 else '')
+    slit_text= get_simple_tag(tag_dict, "EnergySelectionSlitWidth", pad=tag_pads.get("EnergySelectionSlitWidth"))
     #printvars('slit_text',True,True)
 
     # Detectors[EF-Falcon].ExposureTime
-    custom_element= find_element(root, "CustomData", namespace_shared_dict)
-
     # Tag is different on Krios and Glacios
     if scope_title == "Krios":
       detector_tag="Detectors[EF-Falcon].ExposureTime"
     else:
       detector_tag="Detectors[BM-Falcon].ExposureTime"
 
-    detector_text= find_complex_tag(custom_element, detector_tag, namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t' if verbosity>=4 else '')
+    detector_text= get_complex_tag(keyvalue_dict, detector_tag, pad=tag_pads.get(detector_tag))
 
     # microscopeData -> acquisition -> camera -> ExposureTime
-    camera_element= find_element(root, "camera", namespace_shared_dict)
-    cam_exp_text= find_simple_tag(camera_element, "ExposureTime", namespace_shared_dict, pad='\t\t\t\t' if verbosity>=4 else '')
+    cam_exp_text= get_simple_tag(tag_dict, "camera/ExposureTime", pad=tag_pads.get("camera/ExposureTime"))
 
     # Sanity check: Make sure the two exposure times are equal to 1 decimal place
     ###printvars(['detector_text','cam_exp_text'], True)
     assert round( float(detector_text), 1) == round(float(cam_exp_text), 1), f"UH OH!! Exposure time in 'Detectors[EF-Falcon].ExposureTime' ({detector_text}) doesn't equal 'microscopeData -> acquisition -> camera -> ExposureTime' ({cam_exp_text})!"
 
     # Detectors[EF-Falcon].FrameRate
-    frames_text= find_complex_tag(root, "Detectors[EF-Falcon].FrameRate", namespace_array_dict, parent_key='KeyValueOfstringanyType', pad='\t' if verbosity>=4 else '')
-
-    # Movies might be either EER or TIFF format, try both
-    if not options.no_scan:
-      # read the number of frames for the first two movies
-      if xml_idx<2:
-        # EER file is assumed to be the XML prefix + "_EER.eer"
-        eer_file= os.path.splitext(curr_xml)[0] + "_EER.eer"
-        if os.path.exists(eer_file):
-          movie_format= "eer"
-          if verbosity>=4: print(f"  EerFile\t\t\t\t {eer_file}")
-          if options.debug: print(f"  Checking number of frames for '{eer_file}'")
-          num_frames= check_frames(eer_file, debug=False)
-          if options.debug: print(f"  Number of frames: {num_frames}")
-
-          if verbosity>=4:
-            print(f"  NumberOfFrames\t\t\t {num_frames}")
-            print()
+    frames_text= get_complex_tag(keyvalue_dict, "Detectors[EF-Falcon].FrameRate", pad=tag_pads.get("Detectors[EF-Falcon].FrameRate"))
+  # End XML loop
 
-        # Try TIFF
-        else:
-          movie_format= "tiff"
-          tiff_file= os.path.splitext(curr_xml)[0] + "_Fractions.tiff"
-          if os.path.exists(tiff_file):
-            if verbosity>=4: print(f"  TiffFile\t\t\t\t {tiff_file}")
-            if options.debug: print(f"  Checking number of frames for '{tiff_file}'")
-            num_frames= check_frames(tiff_file, debug=False)
-            if options.debug: print(f"  Number of frames: {num_frames}")
-          else:
-            if verbosity>=1: print(f"  WARNING! Movie file (EER or TIFF) for '{curr_xml}' does not exist, continuing...")
-
-        if xml_idx==0:
-          first_frames= num_frames
-        elif xml_idx==1:
-          if num_frames != first_frames:
-            print("ERROR!!")
-            print(f"  Number of frames in first two movies is different! ({first_frames},{num_frames})")
-            print("  Exiting...")
-            exit()
+  # Movies might be either EER or TIFF format, try both
+  if not options.no_scan:
+    # read the number of frames for the first two movies
+    for xml_idx, curr_xml in enumerate(xml_list[:2]):
+      # EER file is assumed to be the XML prefix + "_EER.eer"
+      eer_file= os.path.splitext(curr_xml)[0] + "_EER.eer"
+      if os.path.exists(eer_file):
+        movie_format= "eer"
+        if verbosity>=4: print(f"  EerFile\t\t\t\t {eer_file}")
+        if options.debug: print(f"  Checking number of frames for '{eer_file}'")
+        num_frames= check_frames(eer_file, debug=options.debug)
+        if options.debug: print(f"  Number of frames: {num_frames}")
+
+        if verbosity>=4:
+          print(f"  NumberOfFrames\t\t\t {num_frames}")
+          print()
+
+      # Try TIFF
+      else:
+        movie_format= "tiff"
+        tiff_file= os.path.splitext(curr_xml)[0] + "_Fractions.tiff"
+        if os.path.exists(tiff_file):
+          if verbosity>=4: print(f"  TiffFile\t\t\t\t {tiff_file}")
+          if options.debug: print(f"  Checking number of frames for '{tiff_file}'")
+          num_frames= check_frames(tiff_file, debug=options.debug)
+          if options.debug: print(f"  Number of frames: {num_frames}")
         else:
-          print(f"Unknown state, xml_idx={xml_idx}, exiting...")
-          exit()
-      # End first-2 IF-THEN
-    # End scan-movie IF-THEN
-  # End XML loop
+          if verbosity>=1: print(f"  WARNING! Movie file (EER or TIFF) for '{curr_xml}' does not exist, continuing...")
+
+      if xml_idx==0:
+        first_frames= num_frames
+      elif num_frames != first_frames:
+        print("ERROR!!")
+        print(f"  Number of frames in first two movies is different! ({first_frames},{num_frames})")
+        print("  Exiting...")
+        exit()
+    # End first-2 loop
+  # End scan-movie IF-THEN
+
+  # Defocus & tilt extrema
+  min_df= min(df_list)
+  max_df= max(df_list)
+  min_tilt= min(tilt_list)
+  max_tilt= max(tilt_list)
 
   if options.debug: printvars('num_frames', True)
 
@@ -299,125 +414,170 @@ def main(options):
       cam_exp_text
     )
 
-  # Write the RTF content to a file
-  with open(options.output, "w") as file:
+  # Write the RTF content to a file (buffer is large enough to hold the whole report)
+  with open(options.output, "w", buffering=131072) as file:
       file.write(rtf_content)
 
   if verbosity>=1:
     print(f"\nDone! Report written to: {options.output}")
 
-def find_simple_tag(root, search_string, namespace_dict, pad=None, prefix=None):
+def find_data_dirs(top_dir, max_depth=3):
   """
-  Finds a simple XML tag containing a given search string under a branch in an XML tree
+  Finds directories named 'Data' under a top-level directory
+  Doesn't descend into 'Data' directories, which contain the (many) movie files
+  Like os.walk, symbolic links to directories aren't followed
 
   Parameters:
-    root : XML element tree
-    search_string : string to search for
-    namespace_dict : namespace under which to look for search string
-    pad : optional text between printed tag & value
-    prefix : optional leading text when printing to screen
+    top_dir : top-level directory
+    max_depth : maximum number of levels below top_dir to search, None for no limit
+      (In an EPU project, 'Data' directories are three levels down, e.g., Images-Disc1/GridSquare_*/Data)
 
   Returns:
-      value
+    generator of 'Data' directory paths
   """
 
-  dict_key= list( namespace_dict.keys() )[0]
-  found_element= root.find(f'.//{dict_key}:{search_string}', namespace_dict)
-  namespace_str= "{" + namespace_dict[dict_key] + "}"
-  if found_element is not None:
-    cleaned_tag= found_element.tag.replace(namespace_str, '')
-    found_value= found_element.text
-  else:
-    cleaned_tag= search_string
-    found_value= 'N/A'
+  if os.path.basename(top_dir) == 'Data':
+    yield top_dir
+    return
 
-  if pad:
-    if prefix:
-      print(" ", prefix, cleaned_tag, pad, found_value)
-    else:
-      print(" ", cleaned_tag, pad, found_value)
+  if max_depth is not None and max_depth < 1: return
 
-  return found_value
+  try:
+    with os.scandir(top_dir) as dir_entries:
+      subdirs= [entry.path for entry in dir_entries if entry.is_dir(follow_symlinks=False)]
+  except OSError:
+    return
+
+  for subdir in subdirs:
+    yield from find_data_dirs(subdir, max_depth=None if max_depth is None else max_depth-1)
 
-def find_complex_tag(root, search_string, namespace_dict, parent_key='KeyValueOfstringanyType', pad=None):
+def extract_fields(xml_file, ranges_only=False, print_all=False):
   """
-  Finds a complex XML tag which contains a parent key.
-  Key is of the form: './/{dict_key}:{parent_key}[a:Key="{search_string}"]/a:Key'
+  Extracts the tags of interest from an XML file in a single streaming pass
+
+  Nested tags are stored with their parents, e.g., 'Position/A'.
+  Elements are cleared after they are read so that memory usage stays flat.
+  Parsing stops as soon as all required tags have been found.
 
   Parameters:
-    root : XML element tree
-    search_string : string to search for
-    namespace_dict : namespace under which to look for search string
-    parent_key : parent key, where key is of the form: './/{dict_key}:{parent_key}[a:Key="{search_string}"]/a:Key'
-    pad : optional text between printed tag & value
+    xml_file : XML filename
+    ranges_only : flag to read only the defocus & tilt angle
+    print_all : flag to also read the keys that are only printed
 
   Returns:
-      value
+    dictionary of simple tags
+    dictionary of key-value pairs (from KeyValueOfstringanyType)
   """
 
-  dict_key= list( namespace_dict.keys() )[0]
-  key_string= f'.//{dict_key}:{parent_key}[a:Key="{search_string}"]/a:Key'
-  search_element= root.find(f'.//{dict_key}:{parent_key}[a:Key="{search_string}"]/a:Key', namespace_dict)
+  tag_dict= {}
+  keyvalue_dict= {}
 
-  if search_element is not None:
-    try:
-      found_key= search_element.text
-    except AttributeError as e:
-      print(f"type: {type(search_element)}")
-      printvars(['dict_key','parent_key','search_string'])
-      print('\n',e)
+  if ranges_only:
+    target_tags, required_tags, required_keys= XML_RANGE_TAGS, RANGE_REQUIRED_TAGS, RANGE_REQUIRED_KEYS
+  elif print_all:
+    target_tags, required_tags, required_keys= XML_TARGET_TAGS, REQUIRED_TAGS, PRINT_REQUIRED_KEYS
+  else:
+    target_tags, required_tags, required_keys= XML_TARGET_TAGS, REQUIRED_TAGS, REQUIRED_KEYS
+
+  # lxml filters on the tag in C, so only target elements reach this loop
+  # Whitespace-only text between elements isn't needed, so lxml doesn't need to store it
+  for event, elem in ET.iterparse(xml_file, events=('end',), tag=list(target_tags), remove_blank_text=True):
+    localname= target_tags[elem.tag]
+
+    if localname == 'KeyValueOfstringanyType':
+      # Compare the children's tags directly, which is much faster than find() for a two-element row
+      key_element= value_element= None
+      for child in elem:
+        if child.tag == ARRAY_TAGS['Key']:
+          key_element= child
+        elif child.tag == ARRAY_TAGS['Value']:
+          value_element= child
+
+      # Results are sent back from worker processes, so only keep the defocus for the ranges
+      if key_element is not None and value_element is not None:
+        if not ranges_only or key_element.text == 'AppliedDefocus':
+          keyvalue_dict.setdefault(key_element.text, value_element.text)
+
+    # SpatialScale -> pixelSize -> {x,y} -> numericValue, both axes at once
+    elif localname == 'pixelSize':
+      for axis_element in elem:
+        pixel_key= PIXEL_SIZE_KEYS.get(axis_element.tag)
+        if pixel_key is None: continue
+
+        for value_element in axis_element:
+          if value_element.tag == SHARED_TAGS['numericValue']:
+            tag_dict.setdefault(pixel_key, value_element.text)
 
-    found_value= root.find(f'.//{dict_key}:{parent_key}[a:Key="{search_string}"]/a:Value', namespace_dict).text
+    # Position -> A (tilt angle)
+    elif localname == 'A':
+      if elem.getparent().tag == SHARED_TAGS['Position']:
+        tag_dict.setdefault('Position/A', elem.text)
 
-    if pad:
-      print(" ", found_key, pad, found_value)
+    # microscopeData -> acquisition -> camera -> ExposureTime
+    elif localname == 'ExposureTime':
+      if elem.getparent().tag == SHARED_TAGS['camera']:
+        tag_dict.setdefault('camera/ExposureTime', elem.text)
 
-    return found_value
-  else:
-    return "N/A"
+    else:
+      tag_dict.setdefault(localname, elem.text)
+
+    # Free memory from elements already read
+    elem.clear()
+    while elem.getprevious() is not None:
+      del elem.getparent()[0]
 
-def find_element(root, search_string, namespace_dict, prefix="   ", debug=False):
+    # Stop early once everything needed has been found (tag_dict only holds required tags)
+    if len(tag_dict) == len(required_tags):
+      if all( any(key in keyvalue_dict for key in alternatives) for alternatives in required_keys ): break
+  # End iterparse loop
+
+  return tag_dict, keyvalue_dict
+
+def get_simple_tag(tag_dict, search_string, pad=None, prefix=None):
   """
-  Finds an element containing a given search string under a branch in an XML tree
+  Gets the value of a simple XML tag extracted by extract_fields
 
   Parameters:
-    root : XML element tree
-    search_string : string to search for
-    namespace_dict : namespace under which to look for search string
+    tag_dict : dictionary of simple tags
+    search_string : tag to look up, nested tags of the form 'parent/tag'
+    pad : optional text between printed tag & value
     prefix : optional leading text when printing to screen
-    debug : boolean for printing to screen
-
-  Functions called:
-    loop_branch
 
   Returns:
-      XML element
+      value
   """
 
-  dict_key= list( namespace_dict.keys() )[0]
-  found_element= root.find(f'.//{dict_key}:{search_string}', namespace_dict)
+  found_value= tag_dict.get(search_string, 'N/A')
 
-  if debug:
-    print(f"  found_element: {type(found_element)} {found_element}")
-    namespace_str= "{" + namespace_dict[dict_key] + "}"
-    loop_branch(found_element, namespace_str, prefix=prefix)
+  # Tag name is only needed when printing
+  if pad:
+    cleaned_tag= search_string.split('/')[-1]
+    if prefix:
+      print(" ", prefix, cleaned_tag, pad, found_value)
+    else:
+      print(" ", cleaned_tag, pad, found_value)
 
-  return found_element
+  return found_value
 
-def loop_branch(parent, namespace_shared_str, prefix="   "):
+def get_complex_tag(keyvalue_dict, search_string, pad=None):
   """
-  Prints cleaned-up XML tag
+  Gets the value of a complex XML tag, i.e., a KeyValueOfstringanyType whose Key is the search string
 
   Parameters:
-    parent : XML tree
-    namespace_shared_str : (string) namespace
-    prefix : leading text when printing to screen
+    keyvalue_dict : dictionary of key-value pairs
+    search_string : key to look up
+    pad : optional text between printed tag & value
 
+  Returns:
+      value
   """
 
-  for e_idx, ele in enumerate(parent):
-    cleaned_tag= ele.tag.replace(namespace_shared_str, "")
-    print(f"  {prefix} {e_idx} {cleaned_tag}")
+  found_value= keyvalue_dict.get(search_string, "N/A")
+
+  if pad and search_string in keyvalue_dict:
+    print(" ", search_string, pad, found_value)
+
+  return found_value
 
 def check_frames(fn, debug=False):
   """
@@ -428,13 +588,22 @@ def check_frames(fn, debug=False):
     debug : optional boolean flag to print verbose information
 
   Functions called:
+    count_tiff_frames
     check_exe
 
   Returns:
       number of frames
   """
 
+  # IMOD's 'header' is used if available, otherwise EER & TIFF movies are read directly
   path_header= check_exe('header')
+  if path_header is None:
+    num_frames= count_tiff_frames(fn)
+    if num_frames is None:
+      print(f"\nERROR!! Couldn't read '{fn}' as TIFF, and IMOD 'header' command isn't available! Exiting...\n")
+      exit(12)
+    if debug: print(f"  Read {num_frames} frames directly from '{fn}'")
+    return num_frames
 
   # Read header
   hdr_out = subprocess.run([path_header, fn], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -451,15 +620,77 @@ def check_frames(fn, debug=False):
   section_lines= [x for x in hdr_lines if 'sections' in x]
   assert len(section_lines) == 1, f"ERROR!! IMOD header output has multiple lines (or none) containing the string 'sections'! \n\t'{section_lines}'"
 
-  # Get last three entries containing dimensions
-  movie_dims= [ eval(i) for i in section_lines[0].split()[-3:] ]
+  # Last of the three dimensions is the number of frames
+  num_frames= int( section_lines[0].split()[-1] )
+
+  # Compare with the number of image directories
+  if debug:
+    num_ifds= count_tiff_frames(fn)
+    if num_ifds != num_frames:
+      print(f"  WARNING! Number of image directories in '{fn}' ({num_ifds}) differs from IMOD header ({num_frames})")
+
+  return num_frames
+
+def count_tiff_frames(fn):
+  """
+  Counts the images in a TIFF-based (classic or BigTIFF) movie by following its chain of image file directories (IFDs)
+  EER movies store one frame per IFD, which is how tifffile and RELION count EER frames
+
+  Parameters:
+    fn : filename
 
-  return movie_dims[2]
+  Returns:
+      number of frames, or None if the file isn't a readable TIFF
+  """
 
+  try:
+    with open(fn, 'rb') as movie_obj:
+      # Byte order is 'II' (little-endian) or 'MM' (big-endian)
+      byte_order= movie_obj.read(2)
+      if byte_order == b'II':
+        endian= '<'
+      elif byte_order == b'MM':
+        endian= '>'
+      else:
+        return None
+
+      # Classic TIFF has 32-bit offsets, BigTIFF has 64-bit offsets
+      magic= struct.unpack(endian + 'H', movie_obj.read(2))[0]
+      if magic == 42:
+        offset_fmt, count_fmt, entry_size= 'I', 'H', 12
+      elif magic == 43:
+        movie_obj.read(4)
+        offset_fmt, count_fmt, entry_size= 'Q', 'Q', 20
+      else:
+        return None
+
+      offset_size= struct.calcsize(offset_fmt)
+      count_size= struct.calcsize(count_fmt)
+      ifd_offset= struct.unpack(endian + offset_fmt, movie_obj.read(offset_size))[0]
+
+      # Each IFD starts with its number of entries and ends with the offset of the next one (0 for the last)
+      num_ifds= 0
+      seen_offsets= set()
+      while ifd_offset:
+        if ifd_offset in seen_offsets: return None
+        seen_offsets.add(ifd_offset)
+
+        movie_obj.seek(ifd_offset)
+        num_entries= struct.unpack(endian + count_fmt, movie_obj.read(count_size))[0]
+        movie_obj.seek(ifd_offset + count_size + num_entries*entry_size)
+        ifd_offset= struct.unpack(endian + offset_fmt, movie_obj.read(offset_size))[0]
+        num_ifds+= 1
+  except (OSError, struct.error):
+    return None
+
+  return num_ifds
+
+@functools.lru_cache(maxsize=None)
 def check_exe(search_exe, debug=False):
   """
   Looks for executable path
   Adapted from snartomo-heatwave.py
+  The result is cached, so the PATH is only searched once per executable
 
   Parameters:
     search_exe (str) : executable to check
@@ -586,7 +817,7 @@ def generate_rtf_table(
     cam_exp_text
   ):
   """
-  Generates RTF table
+  Generates RTF table from the template in get_rtf_template
 
   Parameters:
     scope_title
@@ -606,10 +837,58 @@ def generate_rtf_table(
     slit_text
     cam_exp_text
 
+  Functions called:
+    get_rtf_template
+
   Returns:
     RTF text
   """
 
+  if count_text == "true" : cam_text+= " (counting)"
+  if obj_aperture == "None" : obj_aperture= "-"
+
+  if scope_title == "Glacios" :
+    illuminated_area= "2.0"
+  else:
+    illuminated_area= "ILL_AREA"
+
+  if movie_format=='eer':
+    eer_frames= num_frames
+  else:
+    eer_frames= "FRAMES"
+
+  if not movie_format : movie_format= "MOVIE_FMT"
+
+  return get_rtf_template().substitute(
+      scope_title=scope_title,
+      sw_and_version=sw_and_version,
+      cam_text=cam_text,
+      kv_str=kv_str,
+      aperture_text=aperture_text,
+      obj_aperture=obj_aperture,
+      df_range=df_range,
+      slit_text=slit_text,
+      illuminated_area=illuminated_area,
+      cam_exp_text=cam_exp_text,
+      spot_text=spot_text,
+      tilt_range=tilt_range,
+      eer_frames=eer_frames,
+      mag_wx=mag_wx,
+      num_frames=num_frames,
+      pixel_size=pixel_size,
+      movie_format=movie_format
+    )
+
+@functools.lru_cache(maxsize=None)
+def get_rtf_template():
+  """
+  Builds the RTF-table template, with placeholders of the form '${scope_title}'
+  The template is built only once and cached
+
+  Returns:
+    string.Template object
+  """
+
   # Repeated data
   empty_cell=r"\cell \alang1081 \sa0\alang1025 \f5"
   cell_format_1=r"\clbrdrt\brdrs\brdrw10\brdrcf1\clbrdrl\brdrs\brdrw10\brdrcf1\clpadt72\clbrdrb\brdrs\brdrw10\brdrcf1\clbrdrr\brdrs\brdrw10\brdrcf1"
@@ -621,102 +900,86 @@ def generate_rtf_table(
   cell_format_7=r"}{\alang1025 \lang2057\lang2057\b\f5" + "\n"
   cell_format_8=r"}\cell \alang1081 \sa0{\alang1025 \lang2057\lang2057\f5" + "\n"
 
-  rtf_string = r"{\rtf1\ansi\deff4\adeflang1025" + "\n"
-  rtf_string+= r"{\fonttbl{\f0\froman\fprq2\fcharset0 Times New Roman;}{\f1\froman\fprq2\fcharset2 Symbol;}{\f2\fswiss\fprq2\fcharset0 Arial;}{\f3\froman\fprq2\fcharset0 Liberation Serif{\*\falt Times New Roman};}{\f4\fswiss\fprq0\fcharset128 Calibri;}{\f5\fswiss\fprq0\fcharset128 Calibri Light;}{\f6\fnil\fprq2\fcharset0 Calibri;}{\f7\fnil\fprq2\fcharset0 0;}}" + "\n"
-  rtf_string+= r"{\colortbl;\red0\green0\blue0;\red0\green0\blue255;\red0\green255\blue255;\red0\green255\blue0;\red255\green0\blue255;\red255\green0\blue0;\red255\green255\blue0;\red255\green255\blue255;\red0\green0\blue128;\red0\green128\blue128;\red0\green128\blue0;\red128\green0\blue128;\red128\green0\blue0;\red128\green128\blue0;\red128\green128\blue128;\red192\green192\blue192;\red203\green211\blue222;\red234\green237\blue241;}" + "\n"
-  rtf_string+= r"{\stylesheet{\alang1081 \f4 Normal;}}" + "\n"
-  rtf_string+= r"\hyphauto1\viewscale160" + "\n"
-  rtf_string+= r"\trowd\ltrrow" + cell_format_1 + r"\clcbpat17\clvertalc\cellx9183 \alang1081 \sa160{\alang1025 \b\f5" + "\n"
-  rtf_string+= r"Data acquisition parameters}" + cell_format_2 + r"\cellx4431" + cell_format_1 + r"\clcbpat18\clvertalc\cellx9183 \alang1081 \sa160{\alang1025 \i\b\f5" + "\n"
-  rtf_string+= r"Hardware}\cell \alang1081 \sa160{\alang1025 \i\b\f5" + "\n"
-  rtf_string+= "Software" + cell_format_3
-  rtf_string+= r"Microscope" + cell_format_4
-  rtf_string+= scope_title + cell_format_5
-  rtf_string+= r"Data collection" + cell_format_4
-  rtf_string+= sw_and_version + cell_format_3
-  rtf_string+= r"Detector (mode)" + cell_format_8
-  if count_text == "true" : cam_text+= " (counting)"
-  rtf_string+= cam_text + cell_format_5
-  rtf_string+= r"Collection method" + cell_format_4
-  rtf_string+= r"AFIS}" + cell_format_6 + r"\clbrdrt\brdrs\brdrw10\brdrcf1\clbrdrl\brdrs\brdrw10\brdrcf1\clpadt72\cellx7563\clbrdrt\brdrs\brdrw10\brdrcf1\clpadt72\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n"
-  rtf_string+= r"Accelerating voltage" + cell_format_8
-  rtf_string+= kv_str + r"}\cell \alang1081 \sa0\alang1025 \f5" + "\n"
-  rtf_string+= empty_cell + "\n"
-  rtf_string+= cell_format_6 + r"\clbrdrl\brdrs\brdrw10\brdrcf1\clpadt72\cellx7563\clpadt72\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n"
-  rtf_string+= r"Spherical aberration" + cell_format_4
-  rtf_string+= r"2.7}\cell \alang1081 \sa0\alang1025 \f5" + "\n"
-  rtf_string+= empty_cell + "\n"
-  rtf_string+= cell_format_2 + r"\cellx9183 \alang1081 \sa0{\alang1025 \i\b\f5" + "\n"
-  rtf_string+= "Data acquisition parameters" + cell_format_3
+  rtf_parts= []
+  rtf_parts.append(r"{\rtf1\ansi\deff4\adeflang1025" + "\n")
+  rtf_parts.append(r"{\fonttbl{\f0\froman\fprq2\fcharset0 Times New Roman;}{\f1\froman\fprq2\fcharset2 Symbol;}{\f2\fswiss\fprq2\fcharset0 Arial;}{\f3\froman\fprq2\fcharset0 Liberation Serif{\*\falt Times New Roman};}{\f4\fswiss\fprq0\fcharset128 Calibri;}{\f5\fswiss\fprq0\fcharset128 Calibri Light;}{\f6\fnil\fprq2\fcharset0 Calibri;}{\f7\fnil\fprq2\fcharset0 0;}}" + "\n")
+  rtf_parts.append(r"{\colortbl;\red0\green0\blue0;\red0\green0\blue255;\red0\green255\blue255;\red0\green255\blue0;\red255\green0\blue255;\red255\green0\blue0;\red255\green255\blue0;\red255\green255\blue255;\red0\green0\blue128;\red0\green128\blue128;\red0\green128\blue0;\red128\green0\blue128;\red128\green0\blue0;\red128\green128\blue0;\red128\green128\blue128;\red192\green192\blue192;\red203\green211\blue222;\red234\green237\blue241;}" + "\n")
+  rtf_parts.append(r"{\stylesheet{\alang1081 \f4 Normal;}}" + "\n")
+  rtf_parts.append(r"\hyphauto1\viewscale160" + "\n")
+  rtf_parts.append(r"\trowd\ltrrow" + cell_format_1 + r"\clcbpat17\clvertalc\cellx9183 \alang1081 \sa160{\alang1025 \b\f5" + "\n")
+  rtf_parts.append(r"Data acquisition parameters}" + cell_format_2 + r"\cellx4431" + cell_format_1 + r"\clcbpat18\clvertalc\cellx9183 \alang1081 \sa160{\alang1025 \i\b\f5" + "\n")
+  rtf_parts.append(r"Hardware}\cell \alang1081 \sa160{\alang1025 \i\b\f5" + "\n")
+  rtf_parts.append("Software" + cell_format_3)
+  rtf_parts.append(r"Microscope" + cell_format_4)
+  rtf_parts.append("${scope_title}" + cell_format_5)
+  rtf_parts.append(r"Data collection" + cell_format_4)
+  rtf_parts.append("${sw_and_version}" + cell_format_3)
+  rtf_parts.append(r"Detector (mode)" + cell_format_8)
+  rtf_parts.append("${cam_text}" + cell_format_5)
+  rtf_parts.append(r"Collection method" + cell_format_4)
+  rtf_parts.append(r"AFIS}" + cell_format_6 + r"\clbrdrt\brdrs\brdrw10\brdrcf1\clbrdrl\brdrs\brdrw10\brdrcf1\clpadt72\cellx7563\clbrdrt\brdrs\brdrw10\brdrcf1\clpadt72\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n")
+  rtf_parts.append(r"Accelerating voltage" + cell_format_8)
+  rtf_parts.append("${kv_str}" + r"}\cell \alang1081 \sa0\alang1025 \f5" + "\n")
+  rtf_parts.append(empty_cell + "\n")
+  rtf_parts.append(cell_format_6 + r"\clbrdrl\brdrs\brdrw10\brdrcf1\clpadt72\cellx7563\clpadt72\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n")
+  rtf_parts.append(r"Spherical aberration" + cell_format_4)
+  rtf_parts.append(r"2.7}\cell \alang1081 \sa0\alang1025 \f5" + "\n")
+  rtf_parts.append(empty_cell + "\n")
+  rtf_parts.append(cell_format_2 + r"\cellx9183 \alang1081 \sa0{\alang1025 \i\b\f5" + "\n")
+  rtf_parts.append("Data acquisition parameters" + cell_format_3)
 
   #if scope_title == "Krios":
-    #rtf_string+= r"Apertures (C1, C2, C3)" + cell_format_4
+    #rtf_parts.append(r"Apertures (C1, C2, C3)" + cell_format_4)
   #else:
-    #rtf_string+= r"Aperture, C2" + cell_format_4
-  rtf_string+= r"Aperture, C2" + cell_format_4
-
-  rtf_string+= aperture_text + cell_format_5
-  rtf_string+= r"Defocus range (\u181\'3fm, step size)" + cell_format_8
-  ###rtf_string+= r"}{\alang1025 \f5" + "\n"
-  rtf_string+= df_range + r"}" + cell_format_6 + r"" + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n"
-  rtf_string+= r"Objective aperture" + cell_format_4
-  if obj_aperture == "None":
-    rtf_string+= r"-" + cell_format_5
-  else:
-    rtf_string+= obj_aperture + cell_format_5
-  rtf_string+= r"Dose (e/px/sec)" + cell_format_4
-  rtf_string+= r"DOSE/SEC}" + cell_format_6 + r"" + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n"
-  rtf_string+= r"Energy filter slit (eV)" + cell_format_4
-  rtf_string+= slit_text + cell_format_5
-  rtf_string+= r"Dose (e/\u197\'3f}{\alang1025 \lang2057\super\lang2057\b\f5" + "\n"
-  rtf_string+= r"2" + cell_format_7
-  rtf_string+= r"/sec)" + cell_format_4
-  rtf_string+= r"DOSE/A2}" + cell_format_6 + r"" + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n"
-  rtf_string+= r"Illuminated area (\u181\'3fm)" + cell_format_4
-
-  if scope_title == "Glacios" :
-    rtf_string+= r"2.0" + cell_format_5
-  else:
-    rtf_string+= r"ILL_AREA" + cell_format_5
-
-  rtf_string+= r"Exposure time (sec)" + cell_format_4
-  rtf_string+= cam_exp_text + cell_format_3
-  rtf_string+= r"Spot size" + cell_format_4
-  rtf_string+= spot_text + cell_format_5
-  rtf_string+= r"Total dose (e/\u197\'3f}{\alang1025 \lang2057\super\lang2057\b\f5" + "\n"
-  rtf_string+= r"2}{\alang1025 \lang2057\lang2057\b\f5" + "\n"
-  rtf_string+= r")" + cell_format_4
-  rtf_string+= r"TOTAL_DOSE" + cell_format_3
-  rtf_string+= r"Tilt angle (\uc2 \u176\'81\'8b)\uc1 " + cell_format_4
-  rtf_string+= tilt_range + cell_format_5
-  rtf_string+= r"Frames (#)" + cell_format_4
-
-  if movie_format=='eer':
-    rtf_string+= num_frames + r"}" + cell_format_6 + r"" + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n"
-  else:
-    rtf_string+= r"FRAMES}" + cell_format_6 + r"" + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n"
-
-  ###rtf_string+= r"Nominal magnification}\cell\pard\plain \rtlch\ltrch\hich\intbl\sa0{\rtlch\alang1025 \ltrch\hich\af5\f5" + "\n"
-  ##rtf_string+= r"Nominal magnification}\cell \alang1081 \sa0{\alang1025 \f5" + "\n"
-  rtf_string+= r"Nominal magnification" + cell_format_8
-  rtf_string+= mag_wx + cell_format_5
-  rtf_string+= r"Fractions (#)" + cell_format_4
-  rtf_string+= num_frames + r"}" + cell_format_6 + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n"
-  rtf_string+= r"Pixel size (\u197\'3f}{\alang1025 \lang2057\super\lang2057\b\f5" + "\n"
-  rtf_string+= r"2" + cell_format_7
-  rtf_string+= r")" + cell_format_8
-  rtf_string+= pixel_size + cell_format_5
-  rtf_string+= r"Movie format" + cell_format_4
-
-  if movie_format:
-    rtf_string+= movie_format + r"}\cell\row \alang1081" + "\n"
-  else:
-    rtf_string+= r"MOVIE_FMT}\cell\row \alang1081" + "\n"
-
-  rtf_string+= "\n" + r"\par  \alang1081" + "\n"
-  rtf_string+= r"\par }"
-
-  return rtf_string
+    #rtf_parts.append(r"Aperture, C2" + cell_format_4)
+  rtf_parts.append(r"Aperture, C2" + cell_format_4)
+
+  rtf_parts.append("${aperture_text}" + cell_format_5)
+  rtf_parts.append(r"Defocus range (\u181\'3fm, step size)" + cell_format_8)
+  ###rtf_parts.append(r"}{\alang1025 \f5" + "\n")
+  rtf_parts.append("${df_range}" + r"}" + cell_format_6 + r"" + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n")
+  rtf_parts.append(r"Objective aperture" + cell_format_4)
+  rtf_parts.append("${obj_aperture}" + cell_format_5)
+  rtf_parts.append(r"Dose (e/px/sec)" + cell_format_4)
+  rtf_parts.append(r"DOSE/SEC}" + cell_format_6 + r"" + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n")
+  rtf_parts.append(r"Energy filter slit (eV)" + cell_format_4)
+  rtf_parts.append("${slit_text}" + cell_format_5)
+  rtf_parts.append(r"Dose (e/\u197\'3f}{\alang1025 \lang2057\super\lang2057\b\f5" + "\n")
+  rtf_parts.append(r"2" + cell_format_7)
+  rtf_parts.append(r"/sec)" + cell_format_4)
+  rtf_parts.append(r"DOSE/A2}" + cell_format_6 + r"" + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n")
+  rtf_parts.append(r"Illuminated area (\u181\'3fm)" + cell_format_4)
+  rtf_parts.append("${illuminated_area}" + cell_format_5)
+  rtf_parts.append(r"Exposure time (sec)" + cell_format_4)
+  rtf_parts.append("${cam_exp_text}" + cell_format_3)
+  rtf_parts.append(r"Spot size" + cell_format_4)
+  rtf_parts.append("${spot_text}" + cell_format_5)
+  rtf_parts.append(r"Total dose (e/\u197\'3f}{\alang1025 \lang2057\super\lang2057\b\f5" + "\n")
+  rtf_parts.append(r"2}{\alang1025 \lang2057\lang2057\b\f5" + "\n")
+  rtf_parts.append(r")" + cell_format_4)
+  rtf_parts.append(r"TOTAL_DOSE" + cell_format_3)
+  rtf_parts.append(r"Tilt angle (\uc2 \u176\'81\'8b)\uc1 " + cell_format_4)
+  rtf_parts.append("${tilt_range}" + cell_format_5)
+  rtf_parts.append(r"Frames (#)" + cell_format_4)
+  rtf_parts.append("${eer_frames}" + r"}" + cell_format_6 + r"" + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n")
+
+  ###rtf_parts.append(r"Nominal magnification}\cell\pard\plain \rtlch\ltrch\hich\intbl\sa0{\rtlch\alang1025 \ltrch\hich\af5\f5" + "\n")
+  ##rtf_parts.append(r"Nominal magnification}\cell \alang1081 \sa0{\alang1025 \f5" + "\n")
+  rtf_parts.append(r"Nominal magnification" + cell_format_8)
+  rtf_parts.append("${mag_wx}" + cell_format_5)
+  rtf_parts.append(r"Fractions (#)" + cell_format_4)
+  rtf_parts.append("${num_frames}" + r"}" + cell_format_6 + cell_format_1 + r"\cellx7563" + cell_format_1 + r"\cellx9183 \alang1081 \sa0{\alang1025 \lang2057\lang2057\b\f5" + "\n")
+  rtf_parts.append(r"Pixel size (\u197\'3f}{\alang1025 \lang2057\super\lang2057\b\f5" + "\n")
+  rtf_parts.append(r"2" + cell_format_7)
+  rtf_parts.append(r")" + cell_format_8)
+  rtf_parts.append("${pixel_size}" + cell_format_5)
+  rtf_parts.append(r"Movie format" + cell_format_4)
+  rtf_parts.append("${movie_format}" + r"}\cell\row \alang1081" + "\n")
+
+  rtf_parts.append("\n" + r"\par  \alang1081" + "\n")
+  rtf_parts.append(r"\par }")
+
+  return string.Template( "".join(rtf_parts) )
 
 def printvars(variables, quitTF=False, typeTF=False):
     """Print the local variables in the caller's frame.
@@ -797,6 +1060,18 @@ def parse_command_line():
         action="store_true",
         help="Flag to skip EER scan")
 
+    parser.add_argument(
+        "--max_depth",
+        type=int,
+        default=3,
+        help="Maximum number of levels below the top-level directory to search for 'Data' directories (0: no limit)")
+
+    parser.add_argument(
+        "--sample", "-s",
+        type=int,
+        default=0,
+        help="Number of XML files, besides the first two, to read for the defocus & tilt ranges (0: all)")
+
     parser.add_argument(
         "--progress",
         action="store_true",